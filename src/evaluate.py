@@ -3,13 +3,21 @@ Evaluation script for the customer feedback classifier.
 
 This script loads a saved vectorizer and classifier and evaluates them on a
 processed dataset.  It prints a classification report and can optionally
-generate a confusion matrix image.
+generate a confusion matrix image.  Several vectorizer/model pairs can be
+compared in one run with `--pair`.
 """
 
 from __future__ import annotations
 
 import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+
 import joblib
+import matplotlib.pyplot as plt
 import pandas as pd
 from sklearn.metrics import (
     classification_report,
@@ -49,6 +57,137 @@ def evaluate(
         print(f"Confusion matrix saved to {output_fig}")
 
 
+def _score(model_path: str, X_vec, y) -> dict:
+    """Load one classifier and compute its metrics on already-vectorized data."""
+    model = joblib.load(model_path)
+    y_pred = model.predict(X_vec)
+    labels = model.classes_
+    return {
+        "accuracy": accuracy_score(y, y_pred),
+        "macro_f1": f1_score(y, y_pred, average="macro"),
+        "report": classification_report(y, y_pred),
+        "labels": labels,
+        "cm": confusion_matrix(y, y_pred, labels=labels),
+    }
+
+
+def _describe(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}"
+
+
+def _in_order(results: dict, by_vectorizer: dict[str, list[str]]):
+    """Yield results in the order the pairs were given."""
+    for vectorizer_path, model_paths in by_vectorizer.items():
+        for model_path in model_paths:
+            key = (vectorizer_path, model_path)
+            yield key, results[key]
+
+
+def _save_confusion_matrix(cm, labels, title: str, output_path: str) -> str:
+    fig = plot_confusion_matrix(cm, labels, title, output_path)
+    plt.close(fig)
+    return output_path
+
+
+def evaluate_many(
+    data_path: str,
+    pairs: list[tuple[str, str]],
+    fig_dir: str | None = None,
+    n_jobs: int | None = None,
+) -> pd.DataFrame:
+    """Evaluate several (vectorizer, model) pairs on one dataset in a single pass.
+
+    The CSV is read once and each distinct vectorizer transforms it once; all
+    classifiers sharing that vectorizer are scored in parallel threads.
+    Confusion matrices are rendered in a separate process so plotting does not
+    hold up scoring.  A pair that fails (e.g. a vectorizer and model with
+    mismatched features) is reported in the `error` column instead of aborting
+    the comparison.  Prints a combined report and returns the metrics table.
+    """
+    df = pd.read_csv(data_path)
+    X = df["text"]
+    y = df["category"]
+
+    by_vectorizer: dict[str, list[str]] = {}
+    for vectorizer_path, model_path in pairs:
+        models = by_vectorizer.setdefault(vectorizer_path, [])
+        if model_path not in models:
+            models.append(model_path)
+
+    figures = []
+    # Spawn, not fork: the scoring threads are already running when the
+    # plotter starts its worker, and forking a threaded process can deadlock.
+    plotter_ctx = (
+        ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+        if fig_dir
+        else nullcontext()
+    )
+    # The plotter is shut down even when something below raises.
+    with plotter_ctx as plotter, ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        # Submit every model before collecting, so the next vectorizer's
+        # transform overlaps with scoring of the previous one.
+        futures = {}
+        results = {}
+        for vectorizer_path, model_paths in by_vectorizer.items():
+            try:
+                X_vec = joblib.load(vectorizer_path).transform(X)
+            except Exception as e:
+                for model_path in model_paths:
+                    results[(vectorizer_path, model_path)] = {"error": _describe(e)}
+                continue
+            for model_path in model_paths:
+                futures[(vectorizer_path, model_path)] = pool.submit(
+                    _score, model_path, X_vec, y
+                )
+
+        for (vectorizer_path, model_path), future in futures.items():
+            try:
+                res = future.result()
+            except Exception as e:
+                res = {"error": _describe(e)}
+            results[(vectorizer_path, model_path)] = res
+            if plotter is not None and "error" not in res:
+                model_name, vectorizer_name = Path(model_path).stem, Path(vectorizer_path).stem
+                output_fig = os.path.join(
+                    fig_dir, f"confusion_matrix_{model_name}_{vectorizer_name}.png"
+                )
+                figures.append(
+                    plotter.submit(
+                        _save_confusion_matrix,
+                        res["cm"],
+                        res["labels"],
+                        f"Confusion matrix: {model_name} ({vectorizer_name})",
+                        output_fig,
+                    )
+                )
+
+        table = pd.DataFrame(
+            [
+                {
+                    "vectorizer": vectorizer_path,
+                    "model": model_path,
+                    "accuracy": res.get("accuracy"),
+                    "macro_f1": res.get("macro_f1"),
+                    "error": res.get("error", ""),
+                }
+                for (vectorizer_path, model_path), res in _in_order(results, by_vectorizer)
+            ]
+        )
+        if not table["error"].any():
+            table = table.drop(columns="error")
+        print(table.to_string(index=False, float_format="{:.3f}".format, na_rep="-"))
+        for (vectorizer_path, model_path), res in _in_order(results, by_vectorizer):
+            if "error" not in res:
+                print(f"\n=== {model_path} ({vectorizer_path}) ===")
+                print(res["report"])
+
+        for figure in figures:
+            print(f"Confusion matrix saved to {figure.result()}")
+    return table
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Evaluate a trained classifier on a dataset."
@@ -60,21 +199,60 @@ def main():
     )
     parser.add_argument(
         "--vectorizer",
-        default="models/vectorizer.joblib",
-        help="Path to saved vectorizer",
+        default=None,
+        help="Path to saved vectorizer (default: models/vectorizer.joblib)",
     )
     parser.add_argument(
-        "--model", default="models/classifier.joblib", help="Path to saved classifier"
+        "--model",
+        default=None,
+        help="Path to saved classifier (default: models/classifier.joblib)",
     )
     parser.add_argument(
         "--output-fig", default=None, help="Path to save confusion matrix PNG"
     )
+    parser.add_argument(
+        "--pair",
+        nargs=2,
+        action="append",
+        metavar=("VECTORIZER", "MODEL"),
+        help="Vectorizer/model pair to compare; repeat to evaluate several at once",
+    )
+    parser.add_argument(
+        "--fig-dir",
+        default=None,
+        help="With --pair, directory for one confusion matrix PNG per pair",
+    )
+    parser.add_argument(
+        "--n-jobs", type=int, default=None, help="With --pair, threads used for scoring"
+    )
     args = parser.parse_args()
 
+    if args.pair:
+        for flag, value in (
+            ("--vectorizer", args.vectorizer),
+            ("--model", args.model),
+            ("--output-fig", args.output_fig),
+        ):
+            if value is not None:
+                parser.error(f"{flag} cannot be combined with --pair")
+        table = evaluate_many(
+            data_path=args.data_path,
+            pairs=[tuple(p) for p in args.pair],
+            fig_dir=args.fig_dir,
+            n_jobs=args.n_jobs,
+        )
+        if "error" in table.columns:
+            raise SystemExit("Some pairs failed to evaluate; see the error column above.")
+        return
+
+    for flag, value in (("--fig-dir", args.fig_dir), ("--n-jobs", args.n_jobs)):
+        if value is not None:
+            parser.error(f"{flag} requires --pair")
+
     evaluate(
         data_path=args.data_path,
-        vectorizer_path=args.vectorizer,
-        model_path=args.model,
+        vectorizer_path=args.vectorizer or "models/vectorizer.joblib",
+        model_path=args.model or "models/classifier.joblib",
         output_fig=args.output_fig,
     )
 
@@ -1,10 +1,19 @@
 # src/ingest_cfpb.py
+import argparse
+import hashlib
 import re
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
+try:
+    from .io_utils import open_input
+except ImportError:  # run as a script: python src/ingest_cfpb.py
+    from io_utils import open_input
+
 RAW_IN = Path("data/raw/complaints.csv")  # your CFPB download
 RAW_OUT = Path("data/raw/customer_feedback.csv")  # project-standard file name
+STATE = Path("data/raw/customer_feedback.ingested.npz")  # incremental index
 
 # ---- CONFIG ----
 # Keep only CFPB products where our 5 buckets make sense.
@@ -19,6 +28,15 @@ ALLOWED_PRODUCTS_NORM = {
     "money_transfers",
 }
 MIN_TEXT_LEN = 15  # drop super-short narratives
+CHUNK_ROWS = 100_000  # rows per chunk in incremental mode
+TAIL_BYTES = 4096  # output bytes fingerprinted to detect a rewritten output
+
+# Normalized column names (exact names vary by dump)
+TEXT_COL = "consumer_complaint_narrative"
+PRODUCT_COL = "product"
+ISSUE_COL = "issue"
+ID_COL = "complaint_id"
+DATE_COL = "date_received"
 
 
 # ---- helpers ----
@@ -137,70 +155,313 @@ def label_row(narrative: str, issue: str, product: str) -> str:
     return "other"
 
 
-def main():
-    if not RAW_IN.exists():
-        raise SystemExit(f"Input file not found: {RAW_IN}")
-
-    # Read CSV; handle BOM and encodings from Excel/browser exports
+def read_complaints(path: Path) -> pd.DataFrame:
+    # Read CSV; handle BOM and encodings from Excel/browser exports.
+    # Compressed dumps (.zip/.gz/.zst) are decompressed on the fly.
     try:
-        df = pd.read_csv(RAW_IN, encoding="utf-8-sig", low_memory=False)
+        with open_input(path) as f:
+            return pd.read_csv(f, encoding="utf-8-sig", low_memory=False)
     except UnicodeDecodeError:
-        df = pd.read_csv(RAW_IN, encoding="utf-8", low_memory=False)
+        with open_input(path) as f:
+            return pd.read_csv(f, encoding="utf-8", low_memory=False)
 
-    # Normalize column names to snake_case
-    col_map = {c: normalize(c) for c in df.columns}
-    df.rename(columns=col_map, inplace=True)
 
-    # Identify useful columns (exact names vary by dump)
-    text_col = "consumer_complaint_narrative"
-    product_col = "product"
-    issue_col = "issue"
+def iter_complaints(path: Path, chunksize: int):
+    """Chunked `read_complaints`; the encoding fallback applies until the first chunk."""
+    started = False
+    try:
+        with open_input(path) as f:
+            for chunk in pd.read_csv(
+                f, encoding="utf-8-sig", low_memory=False, chunksize=chunksize
+            ):
+                started = True
+                yield chunk
+    except UnicodeDecodeError:
+        if started:
+            raise
+        with open_input(path) as f:
+            yield from pd.read_csv(
+                f, encoding="utf-8", low_memory=False, chunksize=chunksize
+            )
+
 
-    if text_col not in df.columns:
+def label_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Filter a snake_case complaints frame and map it to `text` + `category`."""
+    if TEXT_COL not in df.columns:
         raise SystemExit(
-            f"Column '{text_col}' not found. Available = {list(df.columns)[:20]} ..."
+            f"Column '{TEXT_COL}' not found. Available = {list(df.columns)[:20]} ..."
         )
 
     # Keep only the columns we need
-    keep = [c for c in [text_col, product_col, issue_col] if c in df.columns]
+    keep = [c for c in [TEXT_COL, PRODUCT_COL, ISSUE_COL] if c in df.columns]
     df = df[keep].copy()
 
     # Filter to relevant products (if product column exists)
-    if product_col in df.columns:
-        prod_vals = df[product_col].astype(str).map(normalize)
+    if PRODUCT_COL in df.columns:
+        prod_vals = df[PRODUCT_COL].astype(str).map(normalize)
         df = df[prod_vals.isin(ALLOWED_PRODUCTS_NORM)].copy()
 
     # Drop empty or super-short narratives
-    df = df[df[text_col].notnull()].copy()
-    df[text_col] = df[text_col].astype(str).str.strip()
-    df = df[df[text_col].str.len() >= MIN_TEXT_LEN].copy()
+    df = df[df[TEXT_COL].notnull()].copy()
+    df[TEXT_COL] = df[TEXT_COL].astype(str).str.strip()
+    df = df[df[TEXT_COL].str.len() >= MIN_TEXT_LEN].copy()
 
     # Label rows
     df["category"] = [
         label_row(
-            narrative=row.get(text_col, ""),
-            issue=row.get(issue_col, "") if issue_col in df.columns else "",
-            product=row.get(product_col, "") if product_col in df.columns else "",
+            narrative=row.get(TEXT_COL, ""),
+            issue=row.get(ISSUE_COL, "") if ISSUE_COL in df.columns else "",
+            product=row.get(PRODUCT_COL, "") if PRODUCT_COL in df.columns else "",
         )
         for _, row in df.iterrows()
     ]
 
     # Standardize schema: text + category
-    df.rename(columns={text_col: "text"}, inplace=True)
-    df = df[["text", "category"]]
+    df.rename(columns={TEXT_COL: "text"}, inplace=True)
+    return df[["text", "category"]]
 
-    # Drop duplicates and shuffle
-    df = df.drop_duplicates().sample(frac=1.0, random_state=42).reset_index(drop=True)
 
-    RAW_OUT.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(RAW_OUT, index=False, encoding="utf-8")
-
-    print(f"Saved {len(df)} rows → {RAW_OUT}")
+def print_summary(df: pd.DataFrame) -> None:
     print("\nClass counts:")
     print(df["category"].value_counts())
     print("\nClass %:")
     print((df["category"].value_counts(normalize=True) * 100).round(2))
 
 
+# ---- incremental ingest ----
+# Keys are uint64: the complaint ID itself, or a narrative hash with the top
+# bit set when the ID is missing (complaint IDs never get near 2**63).
+HASH_FLAG = 1 << 63
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def row_keys(df: pd.DataFrame) -> pd.Series:
+    """Stable key per complaint: its ID, or a narrative hash when the ID is missing."""
+    if ID_COL in df.columns:
+        ids = pd.to_numeric(df[ID_COL], errors="coerce")
+    else:
+        ids = pd.Series(np.nan, index=df.index)
+    has_id = ids.notnull()
+    keys = pd.Series(0, index=df.index, dtype="uint64")
+    keys[has_id] = ids[has_id].astype("uint64")
+    if (~has_id).any():
+        if TEXT_COL in df.columns:
+            text = df.loc[~has_id, TEXT_COL].fillna("").astype(str).str.strip()
+        else:
+            text = pd.Series("", index=df.index[~has_id])
+        keys[~has_id] = text.map(lambda t: _hash64(t) | HASH_FLAG).astype("uint64")
+    return keys
+
+
+def output_hashes(df: pd.DataFrame) -> list[int]:
+    """Hash of each (text, category) row, used to dedup the output across runs."""
+    return [_hash64(f"{t}\0{c}") for t, c in zip(df["text"], df["category"])]
+
+
+def tail_fingerprint(path: Path, size: int) -> int:
+    """Hash of the last TAIL_BYTES bytes of the first `size` bytes of `path`."""
+    start = max(0, size - TAIL_BYTES)
+    with path.open("rb") as f:
+        f.seek(start)
+        data = f.read(size - start)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+def empty_state() -> dict:
+    return {
+        "keys": np.empty(0, dtype="uint64"),
+        "rows": np.empty(0, dtype="uint64"),
+        "watermark": None,
+        "output_bytes": 0,
+        "output_tail": 0,
+    }
+
+
+def load_state(path: Path) -> dict:
+    """Load the index written by `save_state` (empty state if there is none)."""
+    if not path.exists():
+        return empty_state()
+    with np.load(path) as state:
+        if "output_tail" not in state.files:
+            return empty_state()  # index from an older layout: rebuild
+        return {
+            "keys": state["keys"],
+            "rows": state["rows"],
+            "watermark": str(state["watermark"]) or None,
+            "output_bytes": int(state["output_bytes"]),
+            "output_tail": int(state["output_tail"]),
+        }
+
+
+def save_state(path: Path, keys, rows, watermark, dst: Path) -> None:
+    """Save the index together with the size and tail fingerprint of `dst`."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    output_bytes = dst.stat().st_size
+    tmp = path.with_name(path.name + ".tmp.npz")
+    np.savez(
+        tmp,
+        keys=np.asarray(keys, dtype="uint64"),
+        rows=np.asarray(rows, dtype="uint64"),
+        watermark=np.str_(watermark or ""),
+        output_bytes=np.int64(output_bytes),
+        output_tail=np.uint64(tail_fingerprint(dst, output_bytes)),
+    )
+    tmp.replace(path)  # atomic: a crashed run never leaves a half-written index
+
+
+def output_matches_state(dst: Path, state: dict) -> bool:
+    """True if `dst` still starts with exactly the bytes the index describes.
+
+    Anything past that prefix can only be rows appended by a run that crashed
+    before saving its index.  A full-mode ingest or a manual edit rewrites
+    the prefix, which the tail fingerprint catches.
+    """
+    size = state["output_bytes"]
+    if not dst.exists() or size <= 0 or dst.stat().st_size < size:
+        return False
+    with dst.open("rb") as f:
+        f.seek(size - 1)
+        if f.read(1) != b"\n":  # the tracked prefix always ends on a full row
+            return False
+    return tail_fingerprint(dst, size) == state["output_tail"]
+
+
+def latest_date(df: pd.DataFrame):
+    if DATE_COL not in df.columns:
+        return None
+    latest = pd.to_datetime(df[DATE_COL], errors="coerce").max()
+    return None if pd.isnull(latest) else latest.date().isoformat()
+
+
+def ingest_incremental(
+    src: Path, dst: Path, state_path: Path, chunk_rows: int = CHUNK_ROWS
+) -> None:
+    """Label only complaints not seen by a previous run and append them to `dst`.
+
+    Known rows are dropped right after parsing, before product filtering and
+    labeling, so the expensive part of the run scales with the delta.  Only
+    rows that made it into the output are indexed: a complaint rejected for a
+    missing narrative or a disallowed product is checked again next run, since
+    CFPB often publishes the narrative months after the complaint.
+    """
+    state = load_state(state_path)
+    fresh_start = not output_matches_state(dst, state)
+    if fresh_start:
+        if state_path.exists():
+            print(f"{dst} does not match the index in {state_path}; rebuilding it")
+        state = empty_state()
+    known = set(state["keys"].tolist())
+    known_rows = set(state["rows"].tolist())
+    watermark = new_watermark = state["watermark"]
+    added_keys, added_rows = [], []
+    n_rows = n_skipped = n_dupes = 0
+    parts = []
+
+    for chunk in iter_complaints(src, chunk_rows):
+        chunk = chunk.rename(columns=normalize)
+        n_rows += len(chunk)
+
+        latest = latest_date(chunk)
+        if latest and (new_watermark is None or latest > new_watermark):
+            new_watermark = latest
+
+        keys = row_keys(chunk)
+        is_known = np.fromiter(
+            (k in known for k in keys.tolist()), dtype=bool, count=len(keys)
+        )
+        is_dupe = ~is_known & keys.duplicated().to_numpy()
+        n_skipped += int(is_known.sum())
+        n_dupes += int(is_dupe.sum())
+
+        labeled = label_frame(chunk[~is_known & ~is_dupe])
+        kept_keys = keys[labeled.index].tolist()
+        known.update(kept_keys)
+        added_keys.extend(kept_keys)
+
+        # Same narrative under a new ID: index the complaint, keep one row
+        is_new_row = []
+        for h in output_hashes(labeled):
+            is_new_row.append(h not in known_rows)
+            if is_new_row[-1]:
+                known_rows.add(h)
+                added_rows.append(h)
+        parts.append(labeled[np.asarray(is_new_row, dtype=bool)])
+
+    columns = ["text", "category"]
+    new = pd.concat([pd.DataFrame(columns=columns), *parts])[columns]
+    new = new.sample(frac=1.0, random_state=42).reset_index(drop=True)
+
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if fresh_start:
+        # No usable index for dst: whatever is in it was not tracked, so start over
+        new.to_csv(dst, index=False, encoding="utf-8")
+        keys_out, rows_out = added_keys, added_rows
+    else:
+        # A crash after the last append but before its index was saved leaves
+        # untracked rows after the tracked prefix (which ends on a newline);
+        # cut them so they are not duplicated.
+        if dst.stat().st_size > state["output_bytes"]:
+            with dst.open("r+b") as f:
+                f.truncate(state["output_bytes"])
+        new.to_csv(dst, mode="a", header=False, index=False, encoding="utf-8")
+        keys_out = np.concatenate([state["keys"], np.asarray(added_keys, dtype="uint64")])
+        rows_out = np.concatenate([state["rows"], np.asarray(added_rows, dtype="uint64")])
+    save_state(state_path, keys_out, rows_out, new_watermark, dst)
+
+    print(f"Read {n_rows} rows, skipped {n_skipped} already ingested, {n_dupes} duplicate IDs")
+    print(f"Watermark: {watermark} → {new_watermark}")
+    print(f"Appended {len(new)} rows → {dst}")
+    if len(new):
+        print_summary(new)
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Map the CFPB complaints CSV to customer_feedback.csv"
+    )
+    ap.add_argument(
+        "--input",
+        type=Path,
+        default=RAW_IN,
+        help="CFPB complaints CSV, or the .zip/.gz/.zst download as-is",
+    )
+    ap.add_argument("--output", type=Path, default=RAW_OUT)
+    ap.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only label complaints not ingested before and append them to --output",
+    )
+    ap.add_argument(
+        "--state", type=Path, default=STATE, help="Index of ingested complaint IDs"
+    )
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = ap.parse_args()
+
+    if not args.input.exists():
+        raise SystemExit(f"Input file not found: {args.input}")
+
+    if args.incremental:
+        ingest_incremental(args.input, args.output, args.state, args.chunk_rows)
+        return
+
+    df = read_complaints(args.input)
+
+    # Normalize column names to snake_case
+    df.rename(columns=normalize, inplace=True)
+    df = label_frame(df)
+
+    # Drop duplicates and shuffle
+    df = df.drop_duplicates().sample(frac=1.0, random_state=42).reset_index(drop=True)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(args.output, index=False, encoding="utf-8")
+
+    print(f"Saved {len(df)} rows → {args.output}")
+    print_summary(df)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,125 @@
+"""
+Streaming readers for (optionally compressed) CSV inputs.
+
+Kept separate from `utils` so the data scripts (`ingest_cfpb.py`,
+`make_sample.py`) only need the standard library and pandas, not the
+plotting stack.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import os
+import queue
+import threading
+import zipfile
+from contextlib import contextmanager
+
+
+class _PrefetchReader(io.RawIOBase):
+    """Binary stream filled by a background thread that reads ahead of the consumer.
+
+    zlib and zstandard release the GIL while decompressing, so the next blocks
+    are inflated while pandas parses the current one.
+    """
+
+    def __init__(self, source, block_size: int = 1 << 20, depth: int = 8):
+        self._source = source
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        self._buf = memoryview(b"")
+        self._eof = False
+        self._error: BaseException | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fill, args=(block_size,), daemon=True)
+        self._thread.start()
+
+    def _fill(self, block_size: int) -> None:
+        try:
+            while not self._stop.is_set():
+                block = self._source.read(block_size)
+                if not block:
+                    break
+                self._queue.put(block)
+        except BaseException as e:  # surface decompression errors in the reader
+            self._queue.put(e)
+            return
+        self._queue.put(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buf and not self._eof:
+            if self._error is not None:
+                raise self._error  # the worker has exited; don't wait on the queue
+            block = self._queue.get()
+            if isinstance(block, BaseException):
+                self._error = block
+                raise block
+            self._eof = not block
+            self._buf = memoryview(block)
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            # Unblock the worker if it is waiting on a full queue
+            while self._thread.is_alive():
+                try:
+                    self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self._source.close()
+        super().close()
+
+
+def _open_decompressed(path: str):
+    """Open a .zip/.gz/.zst file as a decompressing binary stream."""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".gz":
+        return gzip.open(path, "rb")
+    if suffix == ".zip":
+        with zipfile.ZipFile(path) as zf:
+            names = [n for n in zf.namelist() if not n.endswith("/")]
+            csvs = [n for n in names if n.lower().endswith(".csv")] or names
+            if not csvs:
+                raise ValueError(f"No files found in {path}")
+            # The member keeps the archive file open after the ZipFile is closed
+            return zf.open(csvs[0])
+    if suffix == ".zst":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(
+                "Reading .zst files requires the 'zstandard' package (pip install zstandard)."
+            ) from e
+        # read_across_frames: pzstd output and concatenated dumps have several frames
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), closefd=True, read_across_frames=True
+        )
+    raise ValueError(f"Unsupported compression: {path}")
+
+
+COMPRESSED_SUFFIXES = (".zip", ".gz", ".zst")
+
+
+@contextmanager
+def open_input(path):
+    """Context manager giving a CSV source to pass to `pd.read_csv`.
+
+    For local `.zip`, `.gz` and `.zst` files it yields a binary stream that is
+    decompressed on the fly in a background thread, so nothing is written to
+    disk and decompression overlaps with parsing.  Anything else (plain CSV,
+    `.bz2`/`.xz`, URLs, file objects) is yielded unchanged and left to pandas'
+    own handling.
+    """
+    name = os.fspath(path) if isinstance(path, (str, os.PathLike)) else ""
+    if "://" in name or not name.lower().endswith(COMPRESSED_SUFFIXES):
+        yield path
+        return
+    with io.BufferedReader(_PrefetchReader(_open_decompressed(name))) as f:
+        yield f
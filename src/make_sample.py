@@ -3,6 +3,11 @@ import argparse
 from pathlib import Path
 import pandas as pd
 
+try:
+    from .io_utils import open_input
+except ImportError:  # run as a script: python src/make_sample.py
+    from io_utils import open_input
+
 
 def make_sample(
     src: Path,
@@ -11,7 +16,8 @@ def make_sample(
     cap_other: int,
     seed: int = 42,
 ):
-    df = pd.read_csv(src)
+    with open_input(src) as f:  # .zip/.gz/.zst are decompressed on the fly
+        df = pd.read_csv(f)
     if "text" not in df.columns or "category" not in df.columns:
         raise SystemExit("Expected columns 'text' and 'category' in the CSV.")
 
@@ -10,12 +10,20 @@ from __future__ import annotations
 
 import argparse
 import os
+from collections import Counter
 from typing import Tuple
 
 import pandas as pd
 from sklearn.model_selection import train_test_split
 
-from .utils import load_raw_data, clean_text
+from .io_utils import open_input
+from .utils import (
+    load_raw_data,
+    clean_text,
+    hash_split_dataframe,
+    hash_split_mask,
+    check_split_balance,
+)
 
 
 def preprocess_data(
@@ -23,18 +31,66 @@ def preprocess_data(
     drop_duplicates: bool = True,
     test_size: float = 0.2,
     random_state: int = 42,
+    hash_split: bool = False,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Load raw CSV, optionally drop duplicates, clean text and split into train/test."""
+    """Load raw CSV, optionally drop duplicates, clean text and split into train/test.
+
+    With `hash_split`, rows are assigned by a hash of their text (salted with
+    `random_state`) so the split stays stable as the dataset grows.
+    """
     df = load_raw_data(input_path)
     df['text'] = df['text'].apply(clean_text)
     if drop_duplicates:
         df = df.drop_duplicates().reset_index(drop=True)
+    if hash_split:
+        return hash_split_dataframe(df, test_size=test_size, salt=str(random_state))
     train_df, test_df = train_test_split(
         df, test_size=test_size, random_state=random_state, stratify=df['category']
     )
     return train_df.reset_index(drop=True), test_df.reset_index(drop=True)
 
 
+def stream_split_data(
+    input_path: str,
+    output_dir: str,
+    drop_duplicates: bool = True,
+    test_size: float = 0.2,
+    random_state: int = 42,
+    chunksize: int = 100_000,
+) -> Tuple[Counter, Counter]:
+    """Hash-split a CSV into train.csv/test.csv in one chunked pass.
+
+    Only one chunk is held in memory at a time (plus one 64-bit hash per row
+    when dropping duplicates).  Returns the per-class row counts of the train
+    and test files.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        False: os.path.join(output_dir, 'train.csv'),
+        True: os.path.join(output_dir, 'test.csv'),
+    }
+    counts = {False: Counter(), True: Counter()}
+    seen = set()
+    first = True
+
+    with open_input(input_path) as f:
+        for chunk in pd.read_csv(f, chunksize=chunksize):
+            chunk['text'] = chunk['text'].apply(clean_text)
+            if drop_duplicates:
+                row_hashes = pd.util.hash_pandas_object(chunk, index=False)
+                keep = ~row_hashes.duplicated() & ~row_hashes.map(seen.__contains__).astype(bool)
+                seen.update(row_hashes[keep])
+                chunk = chunk[keep]
+
+            is_test = hash_split_mask(chunk['text'], test_size, salt=str(random_state))
+            for side, part in ((False, chunk[~is_test]), (True, chunk[is_test])):
+                part.to_csv(paths[side], mode='w' if first else 'a', header=first, index=False)
+                counts[side].update(part['category'])
+            first = False
+
+    return counts[False], counts[True]
+
+
 def save_splits(train_df: pd.DataFrame, test_df: pd.DataFrame, output_dir: str) -> None:
     """Save train and test DataFrames to CSV files in the specified directory."""
     os.makedirs(output_dir, exist_ok=True)
@@ -45,7 +101,7 @@ def save_splits(train_df: pd.DataFrame, test_df: pd.DataFrame, output_dir: str)
 def main():
     parser = argparse.ArgumentParser(description="Preprocess the customer feedback dataset.")
     parser.add_argument(
-        '--input', default='data/raw/customer_feedback.csv', help='Path to the raw CSV file'
+        '--input', default='data/raw/customer_feedback.csv', help='Path to the raw CSV file (.zip/.gz/.zst also accepted)'
     )
     parser.add_argument(
         '--output-dir', default='data/processed', help='Directory where processed splits will be saved'
@@ -53,11 +109,50 @@ def main():
     parser.add_argument('--no-dedup', action='store_true', help='Do not drop duplicate rows')
     parser.add_argument('--test-size', type=float, default=0.2, help='Proportion of data for the test set')
     parser.add_argument('--random-state', type=int, default=42, help='Random seed for splitting')
+    parser.add_argument(
+        '--hash-split',
+        action='store_true',
+        help='Assign rows by a hash of their text so the split is stable as data grows',
+    )
+    parser.add_argument(
+        '--stream', action='store_true', help='Hash-split the CSV chunk by chunk (implies --hash-split)'
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, default=None, help='Rows per chunk for --stream (default: 100000)'
+    )
     args = parser.parse_args()
 
+    if args.chunk_size is not None and not args.stream:
+        parser.error('--chunk-size requires --stream')
+
+    if args.stream:
+        train_counts, test_counts = stream_split_data(
+            args.input,
+            args.output_dir,
+            drop_duplicates=not args.no_dedup,
+            test_size=args.test_size,
+            random_state=args.random_state,
+            chunksize=args.chunk_size or 100_000,
+        )
+        for problem in check_split_balance(train_counts, test_counts, args.test_size):
+            print(f"Warning: {problem}")
+        n_train, n_test = sum(train_counts.values()), sum(test_counts.values())
+        print(f"Saved {n_train} training rows and {n_test} test rows to {args.output_dir}")
+        return
+
     train_df, test_df = preprocess_data(
-        args.input, drop_duplicates=not args.no_dedup, test_size=args.test_size, random_state=args.random_state
+        args.input,
+        drop_duplicates=not args.no_dedup,
+        test_size=args.test_size,
+        random_state=args.random_state,
+        hash_split=args.hash_split,
     )
+    if args.hash_split:
+        problems = check_split_balance(
+            train_df['category'].value_counts(), test_df['category'].value_counts(), args.test_size
+        )
+        for problem in problems:
+            print(f"Warning: {problem}")
     save_splits(train_df, test_df, args.output_dir)
     print(f"Saved {len(train_df)} training rows and {len(test_df)} test rows to {args.output_dir}")
 
@@ -8,20 +8,25 @@ might consider using a library like `hydra` or `click` for configuration.
 
 from __future__ import annotations
 
+import hashlib
 import os
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from typing import Tuple
 
+from .io_utils import open_input
+
 
 def load_raw_data(path: str) -> pd.DataFrame:
     """Load a CSV file containing customer feedback.
 
     The file is expected to have at least two columns: 'text' and 'category'.
-    Returns a pandas DataFrame.
+    Compressed `.zip`/`.gz`/`.zst` files are read directly.  Returns a pandas
+    DataFrame.
     """
-    return pd.read_csv(path)
+    with open_input(path) as f:
+        return pd.read_csv(f)
 
 
 def clean_text(text: str) -> str:
@@ -61,6 +66,64 @@ def split_dataframe(
     return df.loc[train_idx].reset_index(drop=True), df.loc[test_idx].reset_index(drop=True)
 
 
+def text_bucket(text: str, salt: str = "") -> float:
+    """Map a message to a stable number in [0, 1) from a hash of its cleaned text.
+
+    The value depends only on the text (and the salt), never on the other rows,
+    so a message keeps its train/test side when the dataset grows.
+    """
+    data = f"{salt}\0{clean_text(text)}".encode("utf-8")
+    digest = hashlib.blake2b(data, digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+
+def hash_split_mask(texts: pd.Series, test_size: float = 0.2, salt: str = "") -> pd.Series:
+    """Boolean Series that is True for rows assigned to the test split."""
+    return texts.map(lambda t: text_bucket(t, salt) < test_size).astype(bool)
+
+
+def hash_split_dataframe(
+    df: pd.DataFrame, test_size: float = 0.2, salt: str = ""
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Train/test split by text hash instead of a random shuffle.
+
+    Identical texts always land on the same side, and adding rows never moves
+    existing ones.  Classes are stratified only in expectation; see
+    `check_split_balance`.
+    """
+    is_test = hash_split_mask(df['text'], test_size, salt)
+    return df[~is_test].reset_index(drop=True), df[is_test].reset_index(drop=True)
+
+
+def check_split_balance(train_counts, test_counts, test_size: float) -> list[str]:
+    """Return warnings for classes whose test share is off from `test_size`.
+
+    `train_counts`/`test_counts` map class label -> row count.
+
+    Hash splits are only stratified in expectation, so a class is flagged when
+    it is missing from a split or its test share is more than three binomial
+    standard deviations from `test_size`.
+    """
+    # Accept Counters as well as value_counts() Series (iterating a Series
+    # yields its values, not its labels)
+    train_counts, test_counts = dict(train_counts), dict(test_counts)
+    problems = []
+    for label in sorted(set(train_counts) | set(test_counts)):
+        n_train = train_counts.get(label, 0)
+        n_test = test_counts.get(label, 0)
+        total = n_train + n_test
+        if n_train == 0 or n_test == 0:
+            problems.append(f"class '{label}' has {n_train} train / {n_test} test rows")
+            continue
+        share = n_test / total
+        limit = 3 * (test_size * (1 - test_size) / total) ** 0.5
+        if abs(share - test_size) > limit:
+            problems.append(
+                f"class '{label}' test share {share:.3f} (expected {test_size:.3f} ± {limit:.3f})"
+            )
+    return problems
+
+
 def plot_confusion_matrix(
     cm,
     labels,